@@ -165,37 +165,15 @@ class Formulation(StringRepresentation):
         describe the columns of the matrix, and a mapping from variable names to arrays of data underlying the matrix,
         which include unchanged continuous variables and indicators constructed from categorical variables.
         """
+        matrix_design, data_mapping = self._design_matrix(data)
 
-        # normalize the data
-        data_mapping: Data = {}
-        for name in self._names:
-            try:
-                data_mapping[name] = np.asarray(data[name]).flatten()
-            except Exception as exception:
-                origin = patsy.origin.Origin(self._formula, 0, len(self._formula))
-                raise patsy.PatsyError(f"Failed to load data for '{name}'.", origin) from exception
-
-        # always have at least one column to represent the size of the data
-        if not data_mapping:
-            data_mapping = {'': np.zeros(extract_size(data))}
-
-        # design the matrix (adding an intercept term if there are absorbed terms gets Patsy to use reduced coding)
-        if self._absorbed_terms:
-            matrix_design = design_matrix([patsy.desc.INTERCEPT] + self._terms, data_mapping)
-        else:
-            matrix_design = design_matrix(self._terms, data_mapping)
-
-        # store matrix column indices and build column formulations for each designed column (ignore the intercept if
-        #   it was added only to get Patsy to use reduced coding)
+        # store matrix column indices and build column formulations for each designed column
         column_indices: List[int] = []
         column_formulations: List[ColumnFormulation] = []
-        for term, expression in zip(self._terms, self._expressions):
-            if term != patsy.desc.INTERCEPT or not self._absorbed_terms:
-                term_slice = matrix_design.term_slices[term]
-                for index in range(term_slice.start, term_slice.stop):
-                    column_indices.append(index)
-                    formula = '1' if term == patsy.desc.INTERCEPT else matrix_design.column_names[index]
-                    column_formulations.append(ColumnFormulation(formula, expression))
+        for index, term, expression in self._select_columns(matrix_design):
+            column_indices.append(index)
+            formula = '1' if term == patsy.desc.INTERCEPT else matrix_design.column_names[index]
+            column_formulations.append(ColumnFormulation(formula, expression))
 
         # construct a mapping from continuous variable names that appear in at least one column to their arrays
         underlying_data: Data = {}
@@ -216,6 +194,50 @@ class Formulation(StringRepresentation):
         matrix = build_matrix(matrix_design, data_mapping)
         return matrix[:, column_indices], column_formulations, underlying_data
 
+    def _build_matrix_only(self, data: Mapping) -> Array:
+        """Convert a mapping from variable names to arrays into only the designed matrix, skipping the construction of
+        column formulations and underlying data.
+        """
+        matrix_design, data_mapping = self._design_matrix(data)
+        column_indices = [index for index, _, _ in self._select_columns(matrix_design)]
+        matrix = build_matrix(matrix_design, data_mapping)
+        return matrix[:, column_indices]
+
+    def _select_columns(
+            self, matrix_design: patsy.design_info.DesignInfo) -> List[Tuple[int, patsy.desc.Term, sp.Expr]]:
+        """Select the indices of designed columns that belong in the matrix, along with the terms and expressions that
+        give rise to them. The intercept is ignored if it was added only to get Patsy to use reduced coding.
+        """
+        columns: List[Tuple[int, patsy.desc.Term, sp.Expr]] = []
+        for term, expression in zip(self._terms, self._expressions):
+            if term != patsy.desc.INTERCEPT or not self._absorbed_terms:
+                term_slice = matrix_design.term_slices[term]
+                columns.extend((index, term, expression) for index in range(term_slice.start, term_slice.stop))
+        return columns
+
+    def _design_matrix(self, data: Mapping) -> Tuple[patsy.design_info.DesignInfo, Data]:
+        """Convert a mapping from variable names to arrays into a normalized mapping and use it to design the matrix."""
+
+        # normalize the data
+        data_mapping: Data = {}
+        for name in self._names:
+            try:
+                data_mapping[name] = np.asarray(data[name]).flatten()
+            except Exception as exception:
+                origin = patsy.origin.Origin(self._formula, 0, len(self._formula))
+                raise patsy.PatsyError(f"Failed to load data for '{name}'.", origin) from exception
+
+        # always have at least one column to represent the size of the data
+        if not data_mapping:
+            data_mapping = {'': np.zeros(extract_size(data))}
+
+        # design the matrix (adding an intercept term if there are absorbed terms gets Patsy to use reduced coding)
+        if self._absorbed_terms:
+            matrix_design = design_matrix([patsy.desc.INTERCEPT] + self._terms, data_mapping)
+        else:
+            matrix_design = design_matrix(self._terms, data_mapping)
+        return matrix_design, data_mapping
+
     def _build_ids(self, data: Mapping) -> Array:
         """Convert a mapping from variable names to arrays into the designed matrix of IDs to be absorbed."""
 
@@ -7,7 +7,7 @@ import numpy as np
 from . import exceptions, options
 from .configurations.formulation import Formulation
 from .configurations.integration import Integration
-from .utilities.basics import Array, Groups, RecArray, extract_matrix, interact_ids, structure_matrices, get_indices
+from .utilities.basics import Array, Groups, RecArray, extract_matrix, structure_matrices, get_indices
 
 
 def build_id_data(T: int, J: int, F: int) -> RecArray:
@@ -30,9 +30,9 @@ def build_id_data(T: int, J: int, F: int) -> RecArray:
     `recarray`
         IDs that associate products with markets and firms. Each of the ``T * J`` rows corresponds to a product. Fields:
 
-            - **market_ids** : (`object`) - Market IDs that take on values from ``0`` to ``T - 1``.
+            - **market_ids** : (`int`) - Market IDs that take on values from ``0`` to ``T - 1``.
 
-            - **firm_ids** : (`object`) - Firm IDs that take on values from ``0`` to ``F - 1``.
+            - **firm_ids** : (`int`) - Firm IDs that take on values from ``0`` to ``F - 1``.
 
     Examples
     --------
@@ -54,8 +54,8 @@ def build_id_data(T: int, J: int, F: int) -> RecArray:
     if not isinstance(J, int) or J < F:
         raise ValueError("J must be an int that is at least F.")
     return structure_matrices({
-        'market_ids': (np.repeat(np.arange(T), J).astype(np.int), np.object),
-        'firm_ids': (np.floor(np.tile(np.arange(J), T) * F / J).astype(np.int), np.object)
+        'market_ids': (np.arange(T * J) // J, np.int64),
+        'firm_ids': (np.tile(np.arange(J) * F // J, T), np.int64)
     })
 
 
@@ -87,9 +87,14 @@ def build_ownership(
         where ``value`` is :math:`\mathscr{H}_{jk}` and both ``f`` and ``g`` are firm IDs from the ``firm_ids`` field of
         ``product_data``.
 
-        The default specification, ``lambda: f, g: int(f == g)``, constructs traditional ownership matrices. That is,
-        :math:`\kappa = I`, the identify matrix, implies that :math:`\mathscr{H}_{jk}` is :math:`1` if the same firm
-        produces products :math:`j` and :math:`k`, and is :math:`0` otherwise.
+        The function is first called with arrays of firm IDs for every distinct pair of firms that produce products in
+        the same market. If this fails or does not return an array of the same shape, it is instead called once for
+        each pair of firm IDs, which can be much slower, so functions that support broadcasting with NumPy should be
+        preferred.
+
+        The default specification, ``lambda f, g: np.where(f == g, 1, 0)``, constructs traditional ownership matrices.
+        That is, :math:`\kappa = I`, the identify matrix, implies that :math:`\mathscr{H}_{jk}` is :math:`1` if the same
+        firm produces products :math:`j` and :math:`k`, and is :math:`0` otherwise.
 
         If ``firm_ids`` happen to be indices for an actual :math:`\kappa` matrix, ``lambda f, g: kappa[f, g]`` will
         build ownership matrices according to the matrix ``kappa``.
@@ -125,12 +130,29 @@ def build_ownership(
 
     """
 
-    # validate or use the default kappa specification
-    if kappa_specification is None:
-        kappa_specification = lambda f, g: np.where(f == g, 1, 0).astype(options.dtype)
-    elif callable(kappa_specification):
-        kappa_specification = np.vectorize(kappa_specification, [options.dtype])
-    elif kappa_specification not in {'monopoly', 'single'}:
+    # validate the kappa specification
+    if callable(kappa_specification):
+        specified_kappa = kappa_specification
+
+        def vectorized_kappa(f: Array, g: Array) -> Array:
+            """Attempt to broadcast the specified kappa function over arrays of firm IDs. If this fails or does not give
+            a value for each pair of firm IDs, fall back to calling it for each pair.
+            """
+            shape = np.broadcast(f, g).shape
+
+            # only errors that arise from using arrays as if they were scalars indicate that the function does not
+            #   support broadcasting (for example, the truth value of an array, hashing an array, or indexing with
+            #   object arrays), so other errors are raised without calling the function again for each pair
+            try:
+                values = np.asarray(specified_kappa(f, g), options.dtype)
+                if values.shape == shape:
+                    return values
+            except (TypeError, ValueError, IndexError):
+                pass
+            return np.frompyfunc(specified_kappa, 2, 1)(f, g).astype(options.dtype)
+
+        kappa_specification = vectorized_kappa
+    elif kappa_specification is not None and kappa_specification not in {'monopoly', 'single'}:
         raise ValueError("kappa_specification must be None, callable, 'monopoly', or 'single'.")
 
     # extract and validate IDs
@@ -140,29 +162,60 @@ def build_ownership(
         raise KeyError("product_data must have a market_ids field.")
     if market_ids.shape[1] > 1:
         raise ValueError("The market_ids field of product_data must be one-dimensional.")
-    if callable(kappa_specification):
+    if kappa_specification is None or callable(kappa_specification):
         if firm_ids is None:
             raise KeyError("product_data must have a firm_ids field when kappa_specification is not a special case.")
         if firm_ids.shape[1] > 1:
             raise ValueError("The firm_ids field of product_data must be one-dimensional.")
 
-    # determine the overall number of products and the maximum number in a market
-    market_indices = get_indices(market_ids)
+    # determine the overall number of products, the number in each market, and the maximum number in a market
+    market_groups = Groups(market_ids)
+    sort_indices = market_groups.sort_indices
+    starts = market_groups.reduce_indices
+    counts = market_groups.counts
     N = market_ids.size
-    max_J = max(i.size for i in market_indices.values())
-
-    # construct the ownership matrices
-    ownership = np.full((N, max_J), np.nan, options.dtype)
-    for indices_t in market_indices.values():
+    max_J = counts.max()
+
+    # identify the products in markets with the same number of products
+    indices_mapping = {J: sort_indices[starts[counts == J][:, None] + np.arange(J)] for J in np.unique(counts)}
+
+    # encode firms as integers, which are faster to compare than arbitrary IDs, and evaluate any kappa function only
+    #   once for each distinct pair of firms that produce products in the same market so that values can be reused
+    #   instead of recomputed in every market
+    firm_codes = None
+    kappa_mapping: Dict[int, Array] = {}
+    if kappa_specification is None or callable(kappa_specification):
+        firm_groups = Groups(firm_ids)
+        firm_codes = firm_groups.codes
+        if callable(kappa_specification):
+            G = firm_groups.group_count
+            pair_codes_mapping: Dict[int, Array] = {}
+            for J, indices in indices_mapping.items():
+                codes = firm_codes[indices]
+                pair_codes_mapping[J] = (codes[:, :, None] * G + codes[:, None]).ravel()
+            pair_codes = np.concatenate(list(pair_codes_mapping.values()))
+            unique_pair_codes, inverse = np.unique(pair_codes, return_inverse=True)
+            f = firm_groups.unique[unique_pair_codes // G]
+            g = firm_groups.unique[unique_pair_codes % G]
+            values = kappa_specification(f, g)[inverse]
+            splits = np.cumsum([c.size for c in pair_codes_mapping.values()])[:-1]
+            kappa_mapping = dict(zip(pair_codes_mapping, np.split(values, splits)))
+
+    # construct the ownership matrices all at once for markets with the same number of products, filling only the extra
+    #   columns of smaller markets with missing values so that each element is written once
+    ownership = np.empty((N, max_J), options.dtype)
+    for J, indices in indices_mapping.items():
+        ownership[indices.flat, J:] = np.nan
         if kappa_specification == 'monopoly':
-            ownership[indices_t, :indices_t.size] = 1
+            ownership[indices.flat, :J] = 1
         elif kappa_specification == 'single':
-            ownership[indices_t, :indices_t.size] = np.eye(indices_t.size)
+            ownership[indices.flat, :J] = np.tile(np.eye(J), (indices.shape[0], 1))
+        elif kappa_specification is None:
+            assert firm_codes is not None
+            codes = firm_codes[indices]
+            ownership[indices.flat, :J] = (codes[:, :, None] == codes[:, None]).reshape(-1, J)
         else:
-            assert callable(kappa_specification) and firm_ids is not None
-            ids_t = firm_ids[indices_t]
-            tiled_ids_t = np.tile(np.c_[ids_t], ids_t.size)
-            ownership[indices_t, :indices_t.size] = kappa_specification(tiled_ids_t, tiled_ids_t.T)
+            ownership[indices.flat, :J] = kappa_mapping[J].reshape(-1, J)
 
     return ownership
 
@@ -243,15 +296,24 @@ def build_blp_instruments(formulation: Formulation, product_data: Mapping) -> Ar
     if firm_ids.shape[1] > 1:
         raise ValueError("The firm_ids field of product_data must be one-dimensional.")
 
-    # initialize grouping objects
+    # initialize grouping objects, encoding market-firm pairs as integers instead of tuples of IDs
     market_groups = Groups(market_ids)
-    paired_groups = Groups(interact_ids(market_ids, firm_ids))
+    firm_groups = Groups(firm_ids)
+    paired_groups = Groups(market_groups.codes * firm_groups.group_count + firm_groups.codes)
 
-    # build the instruments
+    # sum characteristics over goods produced by the same firm in each market, and because these groups are nested
+    #   within markets, compute market sums from these smaller sums instead of from the full matrix
     X = build_matrix(formulation, product_data)
-    other = paired_groups.expand(paired_groups.sum(X)) - X
-    rival = market_groups.expand(market_groups.sum(X)) - X - other
-    return np.ascontiguousarray(np.c_[other, rival])
+    paired_sums = paired_groups.sum(X)
+    paired_market_groups = Groups(paired_groups.unique // firm_groups.group_count)
+    market_sums = paired_market_groups.sum(paired_sums)
+
+    # sums over rival goods depend only on the market and firm, so compute them for each market-firm pair and expand
+    #   both types of sums at once into the final matrix, from which only each good's own characteristics are removed
+    K = X.shape[1]
+    instruments = paired_groups.expand(np.c_[paired_sums, paired_market_groups.expand(market_sums) - paired_sums])
+    np.subtract(instruments[:, :K], X, out=instruments[:, :K])
+    return instruments
 
 
 def build_differentiation_instruments(
@@ -376,28 +438,36 @@ def build_differentiation_instruments(
     X = build_matrix(formulation, product_data)
     N, K = X.shape
 
-    # for the local version, do a first pass to compute standard deviations of pairwise differences across all markets
+    # for the local version, do a first pass to compute standard deviations of pairwise differences across all markets,
+    #   extracting each market's rows only once for all characteristics
     sd_mapping: Dict[int, Array] = {}
     if version == 'local':
-        for k in range(K):
-            distances_count = distances_sum = squared_distances_sum = 0
-            for t, indices_t in market_indices.items():
-                x = X[indices_t][:, [k]]
+        distances_count = 0
+        distances_sums = np.zeros(K)
+        squared_distances_sums = np.zeros(K)
+        for indices_t in market_indices.values():
+            X_t = X[indices_t]
+            distances_count += indices_t.size**2 - indices_t.size
+            for k in range(K):
+                x = X_t[:, [k]]
                 distances = x - x.T
                 np.fill_diagonal(distances, 0)
-                distances_count += distances.size - x.size
-                distances_sum += np.sum(distances)
-                squared_distances_sum += np.sum(distances**2)
-            sd_mapping[k] = np.sqrt(squared_distances_sum / distances_count - (distances_sum / distances_count)**2)
+                distances_sums[k] += np.sum(distances)
+                squared_distances_sums[k] += np.sum(distances**2)
+        for k in range(K):
+            sd_mapping[k] = np.sqrt(
+                squared_distances_sums[k] / distances_count - (distances_sums[k] / distances_count)**2
+            )
 
     # build instruments market-by-market to conserve memory
     other_blocks: List[List[Array]] = []
     rival_blocks: List[List[Array]] = []
     for t, indices_t in market_indices.items():
         # build distance matrices for all characteristics
+        X_t = X[indices_t]
         distances_mapping: Dict[int, Array] = {}
         for k in range(K):
-            x = X[indices_t][:, [k]]
+            x = X_t[:, [k]]
             distances_mapping[k] = x - x.T
             np.fill_diagonal(distances_mapping[k], 0 if version == 'quadratic' else np.inf)
 
@@ -520,7 +590,7 @@ def build_matrix(formulation: Formulation, data: Mapping) -> Array:
     """
     if not isinstance(formulation, Formulation):
         raise TypeError("formulation must be a Formulation instance.")
-    matrix = formulation._build_matrix(data)[0]
+    matrix = formulation._build_matrix_only(data)
     if formulation._absorbed_terms:
         absorb = formulation._build_absorb(formulation._build_ids(data))
         matrix, errors = absorb(matrix)
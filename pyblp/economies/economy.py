@@ -43,6 +43,7 @@ class Economy(Container, StringRepresentation):
     H: int
     _product_market_indices: Dict[Hashable, Array]
     _agent_market_indices: Dict[Hashable, Array]
+    _product_market_counts: Array
     _max_J: int
     _max_I: int
     _absorb_demand_ids: Optional[functools.partial]
@@ -84,8 +85,9 @@ class Economy(Container, StringRepresentation):
         self._product_market_indices = get_indices(self.products.market_ids)
         self._agent_market_indices = get_indices(self.agents.market_ids)
 
-        # identify the largest number of products and agents in a market
-        self._max_J = max(i.size for i in self._product_market_indices.values())
+        # count the products in each market and identify the largest number of products and agents in a market
+        self._product_market_counts = np.array([i.size for i in self._product_market_indices.values()])
+        self._max_J = self._product_market_counts.max()
         self._max_I = max(i.size for i in self._agent_market_indices.values())
 
         # construct fixed effect absorption functions
@@ -223,6 +225,11 @@ class Economy(Container, StringRepresentation):
         if name not in names:
             raise NameError(f"The name '{name}' is not one of the underlying variables, {list(sorted(names))}.")
 
+    def _count_products(self, market_ids: Array) -> Tuple[int, int]:
+        """Count the number of products in a set of markets, along with the largest number in any one of them."""
+        counts = self._product_market_counts[np.searchsorted(self.unique_market_ids, np.atleast_1d(market_ids))]
+        return int(counts.sum()), int(counts.max())
+
     def _coerce_optional_firm_ids(self, firm_ids: Optional[Any], market_ids: Optional[Array] = None) -> Array:
         """Coerce optional array-like firm IDs into a column vector and validate it. By default, assume that firm IDs
         are for all markets.
@@ -232,7 +239,7 @@ class Economy(Container, StringRepresentation):
         firm_ids = np.c_[np.asarray(firm_ids, options.dtype)]
         rows = self.N
         if market_ids is not None:
-            rows = sum(i.size for t, i in self._product_market_indices.items() if t in market_ids)
+            rows, _ = self._count_products(market_ids)
         if firm_ids.shape != (rows, 1):
             raise ValueError(f"firm_ids must be None or a {rows}-vector.")
         return firm_ids
@@ -247,8 +254,7 @@ class Economy(Container, StringRepresentation):
         rows = self.N
         columns = self._max_J
         if market_ids is not None:
-            rows = sum(i.size for t, i in self._product_market_indices.items() if t in market_ids)
-            columns = max(i.size for t, i in self._product_market_indices.items() if t in market_ids)
+            rows, columns = self._count_products(market_ids)
         if ownership.shape != (rows, columns):
             raise ValueError(f"ownership must be None or a {rows} by {columns} matrix.")
         return ownership
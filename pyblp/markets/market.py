@@ -123,14 +123,12 @@ class Market(Container):
         if ownership is not None:
             return ownership[:, :self.J]
         if firm_ids is not None:
-            tiled_ids = np.tile(firm_ids, self.J)
-            return np.where(tiled_ids == tiled_ids.T, 1, 0)
+            return np.where(firm_ids == firm_ids.T, 1, 0)
         if self.products.ownership.shape[1] > 0:
             return self.products.ownership[:, :self.J]
         if self.products.firm_ids.size == 0:
             raise ValueError("Either firm IDs or an ownership matrix must have been specified.")
-        tiled_ids = np.tile(self.products.firm_ids, self.J)
-        return np.where(tiled_ids == tiled_ids.T, 1, 0)
+        return np.where(self.products.firm_ids == self.products.firm_ids.T, 1, 0)
 
     def compute_random_coefficients(self, sigma: Optional[Array] = None, pi: Optional[Array] = None) -> Array:
         """Compute all random coefficients. By default, use unchanged parameter values."""
@@ -128,8 +128,7 @@ class BootstrappedResults(Results):
     def _coerce_matrices(self, matrices: Any, market_ids: Array) -> Array:
         """Coerce array-like stacked matrix tensors into a stacked matrix tensor and validate it."""
         matrices = np.atleast_3d(np.asarray(matrices, options.dtype))
-        rows = sum(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
-        columns = max(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
+        rows, columns = self.problem._count_products(market_ids)
         if matrices.shape != (self.draws, rows, columns):
             raise ValueError(f"matrices must be {self.draws} by {rows} by {columns}.")
         return matrices
@@ -139,7 +138,7 @@ class BootstrappedResults(Results):
         if delta is None:
             return None
         delta = np.atleast_3d(np.asarray(delta, options.dtype))
-        rows = sum(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
+        rows, _ = self.problem._count_products(market_ids)
         if delta.shape != (self.draws, rows, 1):
             raise ValueError(f"delta must be None or {self.draws} by {rows}.")
         return delta
@@ -149,7 +148,7 @@ class BootstrappedResults(Results):
         if costs is None:
             return None
         costs = np.atleast_3d(np.asarray(costs, options.dtype))
-        rows = sum(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
+        rows, _ = self.problem._count_products(market_ids)
         if costs.shape != (self.draws, rows, 1):
             raise ValueError(f"costs must be None or {self.draws} by {rows}.")
         return costs
@@ -159,7 +158,7 @@ class BootstrappedResults(Results):
         if prices is None:
             return None
         prices = np.atleast_3d(np.asarray(prices, options.dtype))
-        rows = sum(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
+        rows, _ = self.problem._count_products(market_ids)
         if prices.shape != (self.draws, rows, 1):
             raise ValueError(f"prices must be None or {self.draws} by {rows}.")
         return prices
@@ -169,7 +168,7 @@ class BootstrappedResults(Results):
         if shares is None:
             return shares
         shares = np.atleast_3d(np.asarray(shares, options.dtype))
-        rows = sum(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
+        rows, _ = self.problem._count_products(market_ids)
         if shares.shape != (self.draws, rows, 1):
             raise ValueError(f"shares must be None or {self.draws} by {rows}.")
         return shares
@@ -304,7 +304,7 @@ class OptimalInstrumentResults(StringRepresentation):
         if supply_shifter_formulation is not None:
             demand_instruments = np.c_[
                 demand_instruments,
-                supply_shifter_formulation._build_matrix(self.problem_results.problem.products)[0]
+                supply_shifter_formulation._build_matrix_only(self.problem_results.problem.products)
             ]
 
         # build excluded supply-side instruments
@@ -323,7 +323,7 @@ class OptimalInstrumentResults(StringRepresentation):
             if demand_shifter_formulation is not None:
                 supply_instruments = np.c_[
                     supply_instruments,
-                    demand_shifter_formulation._build_matrix(self.problem_results.problem.products)[0]
+                    demand_shifter_formulation._build_matrix_only(self.problem_results.problem.products)
                 ]
 
         # initialize the problem
@@ -1407,8 +1407,7 @@ class ProblemResults(Results):
     def _coerce_matrices(self, matrices: Any, market_ids: Array) -> Array:
         """Coerce array-like stacked matrices into a stacked matrix and validate it."""
         matrices = np.c_[np.asarray(matrices, options.dtype)]
-        rows = sum(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
-        columns = max(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
+        rows, columns = self.problem._count_products(market_ids)
         if matrices.shape != (rows, columns):
             raise ValueError(f"matrices must be {rows} by {columns}.")
         return matrices
@@ -1418,7 +1417,7 @@ class ProblemResults(Results):
         if delta is None:
             return None
         delta = np.c_[np.asarray(delta, options.dtype)]
-        rows = sum(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
+        rows, _ = self.problem._count_products(market_ids)
         if delta.shape != (rows, 1):
             raise ValueError(f"delta must be None or a {rows}-vector.")
         return delta
@@ -1428,7 +1427,7 @@ class ProblemResults(Results):
         if costs is None:
             return None
         costs = np.c_[np.asarray(costs, options.dtype)]
-        rows = sum(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
+        rows, _ = self.problem._count_products(market_ids)
         if costs.shape != (rows, 1):
             raise ValueError(f"costs must be None or a {rows}-vector.")
         return costs
@@ -1438,7 +1437,7 @@ class ProblemResults(Results):
         if prices is None:
             return None
         prices = np.c_[np.asarray(prices, options.dtype)]
-        rows = sum(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
+        rows, _ = self.problem._count_products(market_ids)
         if prices.shape != (rows, 1):
             raise ValueError(f"prices must be None or a {rows}-vector.")
         return prices
@@ -1448,7 +1447,7 @@ class ProblemResults(Results):
         if shares is None:
             return None
         shares = np.c_[np.asarray(shares, options.dtype)]
-        rows = sum(i.size for t, i in self.problem._product_market_indices.items() if t in market_ids)
+        rows, _ = self.problem._count_products(market_ids)
         if shares.shape != (rows, 1):
             raise ValueError(f"shares must be None or a {rows}-vector.")
         return shares
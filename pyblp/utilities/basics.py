@@ -104,7 +104,7 @@ def generate_items_worker(args: Tuple[Any, tuple, Callable]) -> Tuple[Any, Any]:
 
 def structure_matrices(mapping: Mapping) -> RecArray:
     """Structure a mapping of keys to (array or None, type) tuples as a record array in which each sub-array is
-    guaranteed to be at least two-dimensional.
+    guaranteed to be at least two-dimensional. Arrays are copied only once, when they are assigned to the record array.
     """
 
     # determine the number of rows in all matrices
@@ -114,7 +114,12 @@ def structure_matrices(mapping: Mapping) -> RecArray:
     matrices: List[Array] = []
     dtypes: List[Tuple[Union[str, Tuple[Hashable, str]], Any, Tuple[int]]] = []
     for key, (array, dtype) in mapping.items():
-        matrix = np.zeros((size, 0)) if array is None else np.c_[array]
+        if array is None:
+            matrix = np.zeros((size, 0))
+        else:
+            matrix = np.asarray(array)
+            if matrix.ndim < 2:
+                matrix = matrix.reshape(-1, 1)
         dtypes.append((key, dtype, (matrix.shape[1],)))
         matrices.append(matrix)
 
@@ -345,9 +350,9 @@ class Groups(object):
     def __init__(self, ids: Array) -> None:
         """Sort and index IDs that define groups."""
 
-        # sort the IDs
+        # sort the IDs, preserving their order within groups
         flat = ids.flatten()
-        self.sort_indices = flat.argsort()
+        self.sort_indices = flat.argsort(kind='mergesort')
         sorted_ids = flat[self.sort_indices]
 
         # identify groups
@@ -356,9 +361,10 @@ class Groups(object):
         self.reduce_indices = np.nonzero(changes)[0]
         self.unique = sorted_ids[self.reduce_indices]
 
-        # encode the groups
+        # encode the groups, scattering codes back to the original order instead of sorting again
         sorted_codes = np.cumsum(changes) - 1
-        self.codes = sorted_codes[self.sort_indices.argsort()]
+        self.codes = np.empty_like(sorted_codes)
+        self.codes[self.sort_indices] = sorted_codes
 
         # compute counts
         self.group_count = self.reduce_indices.size
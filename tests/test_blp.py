@@ -458,6 +458,34 @@ def test_special_ownership(simulated_problem: SimulatedProblemFixture) -> None:
     assert np.nansum(single_ownership) == simulation.N
 
 
+@pytest.mark.parametrize('market_ids', [
+    pytest.param(None, id="all markets"),
+    pytest.param(['b'], id="one market"),
+    pytest.param(['a', 'c'], id="two markets")
+])
+def test_product_counts(market_ids: Optional[List[str]]) -> None:
+    """Test that counts of products in selected markets, which are used to validate market-specific inputs, match
+    those computed market-by-market for a problem with differing numbers of products in each market.
+    """
+    state = np.random.RandomState(0)
+    product_market_ids = np.array(list('cabcbbaca'), np.object)
+    problem = Problem(Formulation('0 + prices'), {
+        'market_ids': product_market_ids,
+        'firm_ids': np.arange(product_market_ids.size),
+        'shares': state.uniform(0.01, 0.1, product_market_ids.size),
+        'prices': state.uniform(1, 2, product_market_ids.size),
+        'demand_instruments0': state.uniform(size=product_market_ids.size)
+    })
+    if market_ids is None:
+        selected = problem.unique_market_ids
+    elif len(market_ids) == 1:
+        selected = np.array(market_ids[0], np.object)
+    else:
+        selected = np.array(market_ids, np.object)
+    counts = [(product_market_ids == t).sum() for t in np.atleast_1d(selected)]
+    assert problem._count_products(selected) == (sum(counts), max(counts))
+
+
 @pytest.mark.usefixtures('simulated_problem')
 def test_costs(simulated_problem: SimulatedProblemFixture) -> None:
     """Test that marginal costs computed under specified firm IDs and ownership are the same as costs computed when
@@ -0,0 +1,193 @@
+"""Tests of data construction."""
+
+from typing import Any, Callable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+import pytest
+
+from pyblp import Formulation, build_differentiation_instruments, build_id_data, build_ownership
+from pyblp.utilities.basics import Array, RecArray
+
+
+KAPPA = np.array([[1, 0.5, 0, 0], [0.5, 1, 0, 0], [0, 0, 1, 0.2], [0, 0, 0.2, 1]])
+MERGED = np.array([0, 1, 8, 9])
+
+
+def test_id_data() -> None:
+    """Test that market and firm IDs in balanced panels are native integers with the expected values."""
+    id_data = build_id_data(T=2, J=5, F=4)
+    assert id_data.market_ids.dtype == id_data.firm_ids.dtype == np.int64
+    np.testing.assert_array_equal(id_data.market_ids.flat, [0, 0, 0, 0, 0, 1, 1, 1, 1, 1])
+    np.testing.assert_array_equal(id_data.firm_ids.flat, [0, 0, 1, 2, 3, 0, 0, 1, 2, 3])
+
+
+def build_unbalanced_id_data(T: int, F: int, max_J: int, seed: int = 0) -> RecArray:
+    """Build shuffled object market and firm IDs for markets with differing numbers of products."""
+    state = np.random.RandomState(seed)
+    counts = state.randint(1, max_J + 1, T)
+    counts[0] = max_J
+    market_ids = np.repeat([f'market{t}' for t in range(T)], counts).astype(np.object)
+    firm_ids = np.array([f'firm{f}' for f in state.randint(0, F, market_ids.size)], np.object)
+    order = state.permutation(market_ids.size)
+    dtype = [('market_ids', np.object), ('firm_ids', np.object)]
+    return np.rec.fromarrays([market_ids[order], firm_ids[order]], dtype=dtype)
+
+
+def build_reference_ownership(id_data: RecArray, kappa: Callable[[Any, Any], float]) -> Array:
+    """Build ownership matrices market-by-market, calling a kappa function once for each pair of firm IDs."""
+    market_ids = np.asarray(id_data['market_ids']).flatten()
+    firm_ids = np.asarray(id_data['firm_ids']).flatten()
+    max_J = max((market_ids == t).sum() for t in np.unique(market_ids))
+    ownership = np.full((market_ids.size, max_J), np.nan)
+    for t in np.unique(market_ids):
+        indices = np.flatnonzero(market_ids == t)
+        for j in indices:
+            ownership[j, :indices.size] = [kappa(firm_ids[j], firm_ids[i]) for i in indices]
+    return ownership
+
+
+@pytest.mark.parametrize('kappa', [
+    pytest.param(lambda f, g: KAPPA[f, g], id="broadcastable"),
+    pytest.param(lambda f, g: 1 if f == g or (f < 2 and g < 2) else 0, id="scalar-only"),
+    pytest.param(
+        lambda f, g: 1.0 if f in MERGED and g in MERGED else float(f == g),
+        id="scalar-only with scalar output for arrays"
+    ),
+    pytest.param(lambda f, g: 1, id="constant")
+])
+@pytest.mark.parametrize('T', [pytest.param(1, id="one market"), pytest.param(3, id="three markets")])
+def test_callable_kappa(kappa: Callable[[Any, Any], float], T: int) -> None:
+    """Test that ownership matrices built with callable kappa specifications, which may or may not support broadcasting,
+    match those built by calling each specification once for each pair of firm IDs.
+    """
+    id_data = build_id_data(T=T, J=4, F=4)
+    np.testing.assert_array_equal(build_ownership(id_data, kappa), build_reference_ownership(id_data, kappa))
+
+
+def test_kappa_errors() -> None:
+    """Test that errors raised by a kappa function for reasons other than a lack of broadcasting support are raised
+    without calling the function again for each pair of firm IDs.
+    """
+    calls = []
+
+    def kappa(f: Any, g: Any) -> float:
+        """Raise an error that is unrelated to broadcasting."""
+        calls.append((f, g))
+        raise ZeroDivisionError
+
+    with pytest.raises(ZeroDivisionError):
+        build_ownership(build_id_data(T=1, J=4, F=4), kappa)
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize(['kappa_specification', 'build_block'], [
+    pytest.param(None, lambda ids: np.where(ids == ids.T, 1, 0), id="default"),
+    pytest.param('monopoly', lambda ids: np.ones((ids.size, ids.size)), id="monopoly"),
+    pytest.param('single', lambda ids: np.eye(ids.size), id="single"),
+    pytest.param(lambda f, g: np.where(f == g, 1, 0.5), lambda ids: np.where(ids == ids.T, 1, 0.5), id="callable")
+])
+@pytest.mark.parametrize('T, F', [
+    pytest.param(20, 5, id="many markets with few firms"),
+    pytest.param(2, 50, id="few markets with many firms")
+])
+def test_unbalanced_ownership(
+        kappa_specification: Optional[Union[str, Callable[[Any, Any], float]]], build_block: Callable[[Array], Array],
+        T: int, F: int) -> None:
+    """Test that ownership matrices for shuffled markets with differing numbers of products and object IDs match those
+    built market-by-market, including missing values in the extra columns of smaller markets.
+    """
+    id_data = build_unbalanced_id_data(T, F, max_J=8)
+    market_ids = id_data.market_ids[:, None]
+    firm_ids = id_data.firm_ids[:, None]
+    expected = np.full((market_ids.size, 8), np.nan)
+    for t in np.unique(market_ids):
+        indices = np.flatnonzero(market_ids == t)
+        expected[indices, :indices.size] = build_block(firm_ids[indices])
+    np.testing.assert_array_equal(build_ownership(id_data, kappa_specification), expected)
+
+
+@pytest.mark.parametrize('T, F', [
+    pytest.param(20, 5, id="many markets with few firms"),
+    pytest.param(2, 50, id="few markets with many firms")
+])
+def test_kappa_evaluations(T: int, F: int) -> None:
+    """Test that a kappa function is evaluated only on pairs of firms that produce products in the same market, even
+    when some firm is alone in its market.
+    """
+    id_data = build_unbalanced_id_data(T, F, max_J=8)
+    id_data = np.rec.array(np.r_[id_data, np.rec.fromrecords([('isolated', 'isolated')], dtype=id_data.dtype)])
+    evaluated: List[Set[Tuple[Any, Any]]] = []
+
+    def kappa(f: Array, g: Array) -> Array:
+        """Record the pairs of firm IDs on which kappa is evaluated."""
+        f, g = np.broadcast_arrays(f, g)
+        evaluated.append(set(zip(f.flat, g.flat)))
+        return np.where(f == g, 1, 0)
+
+    build_ownership(id_data, kappa)
+    unique_firm_ids = np.unique(id_data.firm_ids)
+    market_pairs = {
+        (f, g) for t in np.unique(id_data.market_ids) for f in id_data.firm_ids[id_data.market_ids == t]
+        for g in id_data.firm_ids[id_data.market_ids == t]
+    }
+    all_pairs = {(f, g) for f in unique_firm_ids for g in unique_firm_ids}
+    assert all_pairs != market_pairs
+    assert set.union(*evaluated) == market_pairs
+
+
+def test_market_pair_kappa() -> None:
+    """Test that a kappa function that is only defined for pairs of firms that produce products in the same market
+    gives the same ownership matrices as when it is called market-by-market.
+    """
+    id_data = build_id_data(T=20, J=4, F=4)
+    id_data.firm_ids[id_data.market_ids >= 10] += 4
+    pairs = {}
+    for t in np.unique(id_data.market_ids):
+        firm_ids = id_data.firm_ids[id_data.market_ids == t]
+        pairs.update({(f, g): 1.0 if f == g else 0.5 for f in firm_ids for g in firm_ids})
+    kappa = lambda f, g: pairs[(f, g)]
+    ownership = build_ownership(id_data, kappa)
+    np.testing.assert_array_equal(ownership, build_reference_ownership(id_data, kappa))
+
+
+@pytest.mark.parametrize(['version', 'interact'], [
+    pytest.param('local', False, id="local"),
+    pytest.param('quadratic', False, id="quadratic"),
+    pytest.param('quadratic', True, id="quadratic with interactions")
+])
+def test_differentiation_instruments(version: str, interact: bool) -> None:
+    """Test that differentiation instruments for shuffled markets with differing numbers of products and object IDs
+    match those built market-by-market by summing over explicit ownership and non-ownership matrices.
+    """
+    id_data = build_unbalanced_id_data(T=20, F=5, max_J=8)
+    X = np.random.RandomState(1).normal(size=(id_data.size, 2))
+    product_data = {'market_ids': id_data.market_ids, 'firm_ids': id_data.firm_ids, 'x': X[:, 0], 'y': X[:, 1]}
+    market_indices = [np.flatnonzero(id_data.market_ids == t) for t in np.unique(id_data.market_ids)]
+
+    # compute standard deviations of pairwise differences between distinct products across all markets
+    sds = []
+    for x in X.T:
+        differences = [(x[i, None] - x[None, i])[~np.eye(i.size, dtype=bool)] for i in market_indices]
+        sds.append(np.concatenate(differences).std())
+
+    # build instruments market-by-market, stacking them in the order of sorted market IDs
+    other_blocks: List[Array] = []
+    rival_blocks: List[Array] = []
+    for indices in market_indices:
+        firm_ids = id_data.firm_ids[indices, None]
+        ownership = (firm_ids == firm_ids.T).astype(np.float64)
+        distances = [x[indices, None] - x[None, indices] for x in X.T]
+        if version == 'quadratic':
+            pairs = [(0, 0), (0, 1), (1, 1)] if interact else [(0, 0), (1, 1)]
+            terms = [distances[k1] * distances[k2] for k1, k2 in pairs]
+        else:
+            for d in distances:
+                np.fill_diagonal(d, np.inf)
+            terms = [(np.abs(d) < sd).astype(np.float64) for d, sd in zip(distances, sds)]
+        other_blocks.append(np.column_stack([(ownership * t).sum(axis=1) for t in terms]))
+        rival_blocks.append(np.column_stack([((1 - ownership) * t).sum(axis=1) for t in terms]))
+
+    # compare the instruments
+    instruments = build_differentiation_instruments(Formulation('0 + x + y'), product_data, version, interact)
+    expected = np.c_[np.concatenate(other_blocks), np.concatenate(rival_blocks)]
+    np.testing.assert_allclose(instruments, expected, atol=1e-12, rtol=0)
@@ -8,7 +8,7 @@ import numpy as np
 import patsy
 import pytest
 
-from pyblp import Formulation
+from pyblp import Formulation, build_matrix
 from pyblp.utilities.basics import Array, Data
 
 
@@ -92,6 +92,7 @@ def test_matrices(
         formulation = Formulation(formula)
         assert str(formulation)
         matrix, column_formulations, underlying_data = formulation._build_matrix(formula_data)
+        np.testing.assert_array_equal(formulation._build_matrix_only(formula_data), matrix)
         evaluated_matrix = np.column_stack([ones * f.evaluate(underlying_data) for f in column_formulations])
         derivatives = np.column_stack([ones * f.evaluate_derivative('x', underlying_data) for f in column_formulations])
 
@@ -191,11 +192,17 @@ def test_ids(
     pytest.param(patsy.PatsyError, 'Q("a")', None, id="unsupported patsy quoting"),
     pytest.param(patsy.PatsyError, '', 'Q("a")', id="absorbed unsupported patsy quoting")
 ])
-def test_invalid_formulas(formula_data: Data, exception: Type[Exception], formula: Any, absorb: Any) -> None:
-    """Test that an invalid formula gives rise to an exception."""
+@pytest.mark.parametrize('build', [
+    pytest.param(lambda f, d: f._build_matrix(d), id="matrix with column formulations"),
+    pytest.param(lambda f, d: build_matrix(f, d), id="matrix only")
+])
+def test_invalid_formulas(
+        formula_data: Data, exception: Type[Exception], formula: Any, absorb: Any,
+        build: Callable[[Formulation, Data], Any]) -> None:
+    """Test that an invalid formula gives rise to an exception, regardless of whether column formulations are built."""
     try:
         formulation = Formulation(formula, absorb)
-        formulation._build_matrix(formula_data)
+        build(formulation, formula_data)
         if absorb is not None:
             formulation._build_ids(formula_data)
     except exception: